@@ -1,27 +1,60 @@
-import json
 from http import HTTPStatus
 
-from fastapi import APIRouter
+import msgspec
+from fastapi import HTTPException, Request
 from starlette.responses import Response
 
 from app_fastapi.schemas.event import EventSchema
 from app_fastapi.services import event_service
 
-# Initialize the router
-router = APIRouter()
+# Reusable decoder for the event payload, built once instead of per request
+_EVENT_DECODER = msgspec.json.Decoder(EventSchema)
 
+# The acceptance response is the same for every event, so build it once
+_ACCEPTED = Response(
+    content=event_service.RESULT_BYTES,
+    status_code=HTTPStatus.ACCEPTED,
+    media_type="application/json",
+)
 
-@router.post("/", dependencies=[])
-def handle_event(data: EventSchema) -> Response:
+# Clients that don't read the body can send "Prefer: return=minimal" (RFC 7240)
+# and get an empty 204 instead
+_NO_CONTENT = Response(status_code=HTTPStatus.NO_CONTENT)
+
+
+def _prefers_minimal(prefer: str) -> bool:
+    # Prefer is a comma-separated list of preferences, each optionally
+    # followed by ";"-separated parameters, e.g. "return=minimal, respond-async"
+    return any(
+        pref.split(";", 1)[0].replace(" ", "").lower() == "return=minimal"
+        for pref in prefer.split(",")
+    )
+
+
+# Mounted as a plain Starlette route in main.py, so FastAPI's dependency
+# solver and body parsing are skipped entirely
+async def handle_event(request: Request) -> Response:
     """
     Endpoint to receive an event.
     It delegates the business logic to the event_service.
     """
+    # Decode and validate the raw body with msgspec (bypasses FastAPI's Pydantic parsing)
+    try:
+        data = _EVENT_DECODER.decode(await request.body())
+    except (msgspec.DecodeError, msgspec.ValidationError) as exc:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=str(exc))
+    # event_data is kept raw, so check it is a JSON object by its first byte
+    if memoryview(data.event_data)[:1] != b"{":
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail="Expected `object` - at `$.event_data`",
+        )
+
     # Call the service layer to handle the logic
-    result = event_service.handle_event_logic(data)
+    event_service.handle_event_logic(data)
 
-    # Return acceptance response
-    return Response(
-        content=json.dumps(result),
-        status_code=HTTPStatus.ACCEPTED,
-    ) 
\ No newline at end of file
+    # Return the precomputed response
+    prefer = request.headers.get("prefer")
+    if prefer is not None and _prefers_minimal(prefer):
+        return _NO_CONTENT
+    return _ACCEPTED
\ No newline at end of file
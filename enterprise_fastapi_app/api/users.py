@@ -1,12 +1,13 @@
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 
 from app_fastapi.schemas import user
 
 router = APIRouter()
 
 
-@router.post("/", response_model=user.User)
-def create_user(user_in: user.UserCreate):
+@router.post("/", response_class=ORJSONResponse, responses={200: {"model": user.User}})
+async def create_user(user_in: user.UserCreate):
     """
     Create a new user.
     In a real app, this would save the user to a database.
@@ -15,9 +16,12 @@ def create_user(user_in: user.UserCreate):
     # We are "creating" a user and returning its data.
     # The password would be hashed and not returned.
     user_data = user_in.model_dump()
-    return user.User(
+    user_obj = user.User(
         id=1,
         email=user_data["email"],
         full_name=user_data["full_name"],
         is_active=True,
-    ) 
\ No newline at end of file
+    )
+
+    # Return the serialized user directly so FastAPI skips jsonable_encoder
+    return ORJSONResponse(user_obj.model_dump())
\ No newline at end of file
@@ -1,10 +1,24 @@
-from pydantic_settings import BaseSettings
+from typing import Final
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(frozen=True, env_file=None)
+
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "FastAPI Enterprise Example"
     PROJECT_VERSION: str = "1.0.0"
+    # Serve the OpenAPI schema and interactive docs (disable in production)
+    ENABLE_DOCS: bool = False
+
 
+settings = Settings()
 
-settings = Settings() 
\ No newline at end of file
+# Plain string constants derived once from the settings, for use at app startup
+PROJECT_NAME: Final[str] = settings.PROJECT_NAME
+PROJECT_VERSION: Final[str] = settings.PROJECT_VERSION
+OPENAPI_URL: Final[str | None] = (
+    f"{settings.API_V1_STR}/openapi.json" if settings.ENABLE_DOCS else None
+)
+DOCS_URL: Final[str | None] = "/docs" if settings.ENABLE_DOCS else None
\ No newline at end of file
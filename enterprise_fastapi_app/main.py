@@ -1,20 +1,54 @@
+import logging
+import os
+
+import orjson
+import uvicorn
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 
 from app_fastapi.api import events, users
-from app_fastapi.core.config import settings
+from app_fastapi.core.config import DOCS_URL, OPENAPI_URL, PROJECT_NAME, PROJECT_VERSION
+
+# Configure logging (DEBUG output such as per-event logs is off by default)
+logging.basicConfig(level=logging.INFO)
 
 # Initialize FastAPI app
 app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version=settings.PROJECT_VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    title=PROJECT_NAME,
+    version=PROJECT_VERSION,
+    openapi_url=OPENAPI_URL,
+    docs_url=DOCS_URL,
+    redoc_url=None,
+    default_response_class=ORJSONResponse,
 )
 
+# Compress larger JSON responses; small bodies (like the event ack) skip gzip
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
 # Include the routers from the api directory
-app.include_router(events.router, prefix="/events", tags=["events"])
 app.include_router(users.router, prefix="/users", tags=["users"])
 
+# The events endpoint has no dependencies, so mount it as a raw Starlette route
+app.add_route("/events/", events.handle_event, methods=["POST"])
+
+
+# The welcome payload never changes, so serialize it once at import time
+_ROOT_BODY = orjson.dumps({"message": f"Welcome to {PROJECT_NAME}"})
+_ROOT_RESP = Response(content=_ROOT_BODY, media_type="application/json")
+
 
 @app.get("/")
-def read_root():
-    return {"message": f"Welcome to {settings.PROJECT_NAME}"}
\ No newline at end of file
+async def read_root():
+    return _ROOT_RESP
+
+
+# One worker per CPU core; uvicorn's "auto" loop/http settings already pick
+# uvloop and httptools when installed (fastapi[standard] installs both)
+if __name__ == "__main__":
+    uvicorn.run(
+        "app_fastapi.main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=os.cpu_count(),
+    )
\ No newline at end of file
@@ -1,41 +1,54 @@
-import requests
-import json
+import asyncio
+import itertools
+import httpx
+import orjson
 import uuid
 
+# Base URL of the running server
+BASE_URL = "http://localhost:8000"
 
-def send_test_event():
-    # API endpoint URL
-    url = "http://localhost:8000/events/"
+# Number of events fired concurrently by send_test_events()
+NUM_EVENTS = 100
 
+# Headers for JSON content (the client keeps connections alive by default)
+HEADERS = {"Content-Type": "application/json"}
+
+# Pool of pre-generated event IDs, cycled so load tests don't call uuid4() per event
+_UUID_POOL = [str(uuid.uuid4()) for _ in range(1024)]
+_UUID_ITER = itertools.cycle(_UUID_POOL)
+
+
+async def send_test_event(client: httpx.AsyncClient) -> httpx.Response:
     # Sample event data
     event_data = {
-        "event_id": str(uuid.uuid4()),
+        "event_id": next(_UUID_ITER),
         "event_type": "test_event",
         "event_data": {
             "message": "Can you explain how to use FastAPI in an enterprise app?",
         },
     }
 
-    # Headers for JSON content
-    headers = {"Content-Type": "application/json"}
-
-    print("--- Sending Test Event ---")
     # Send POST request to the endpoint
+    response = await client.post("/events/", content=orjson.dumps(event_data))
+    response.raise_for_status()  # Raise an exception for bad status codes
+    return response
+
+
+async def send_test_events(client: httpx.AsyncClient, n: int = NUM_EVENTS):
+    print(f"--- Sending {n} Test Events Concurrently ---")
+    # Fire all requests at once so the server handles them concurrently
     try:
-        response = requests.post(url=url, data=json.dumps(event_data), headers=headers)
-        response.raise_for_status()  # Raise an exception for bad status codes
+        responses = await asyncio.gather(*(send_test_event(client) for _ in range(n)))
 
-        # Print response information
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.json()}")
-    except requests.exceptions.RequestException as e:
+        # Print response information for the first event
+        print(f"Status Code: {responses[0].status_code}")
+        print(f"Response: {orjson.loads(responses[0].content)}")
+        print(f"Sent {len(responses)} events")
+    except httpx.HTTPError as e:
         print(f"An error occurred: {e}")
 
 
-def create_test_user():
-    # API endpoint URL
-    url = "http://localhost:8000/users/"
-
+async def create_test_user(client: httpx.AsyncClient):
     # Sample user data
     user_data = {
         "email": "test@example.com",
@@ -43,22 +56,25 @@ def create_test_user():
         "full_name": "Test User",
     }
 
-    # Headers for JSON content
-    headers = {"Content-Type": "application/json"}
-
     print("\n--- Creating Test User ---")
     # Send POST request to the endpoint
     try:
-        response = requests.post(url=url, data=json.dumps(user_data), headers=headers)
+        response = await client.post("/users/", content=orjson.dumps(user_data))
         response.raise_for_status()  # Raise an exception for bad status codes
 
         # Print response information
         print(f"Status Code: {response.status_code}")
-        print(f"Response: {response.json()}")
-    except requests.exceptions.RequestException as e:
+        print(f"Response: {orjson.loads(response.content)}")
+    except httpx.HTTPError as e:
         print(f"An error occurred: {e}")
 
 
+async def main():
+    # One pooled client shared by every request
+    async with httpx.AsyncClient(base_url=BASE_URL, headers=HEADERS) as client:
+        await send_test_events(client)
+        await create_test_user(client)
+
+
 if __name__ == "__main__":
-    send_test_event()
-    create_test_user()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -1,10 +1,15 @@
-from pydantic import BaseModel
+import msgspec
 
 
 # Define the event schema
-class EventSchema(BaseModel):
+# msgspec decodes and validates JSON straight into this struct, which is much
+# cheaper than going through Pydantic for a plain three-field payload
+class EventSchema(msgspec.Struct):
     """Event Schema"""
 
     event_id: str
     event_type: str
-    event_data: dict 
\ No newline at end of file
+    # Kept as a zero-copy view of the raw JSON; decode it with
+    # msgspec.json.decode(event_data) only when its contents are needed
+    # (the endpoint checks that it is a JSON object)
+    event_data: msgspec.Raw
\ No newline at end of file
@@ -1,18 +1,33 @@
-from pydantic import BaseModel, EmailStr
+import re
+from typing import Annotated
+
+from pydantic import AfterValidator, BaseModel, ConfigDict
+
+# Compiled once at import; a cheap syntactic check instead of EmailStr's full
+# email-validator parse on every request
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def _fast_email_check(value: str) -> str:
+    if not _EMAIL_RE.match(value):
+        raise ValueError("value is not a valid email address")
+    return value
+
+
+Email = Annotated[str, AfterValidator(_fast_email_check)]
 
 
 class UserBase(BaseModel):
-    email: EmailStr
+    email: Email
     full_name: str | None = None
 
 
 class UserCreate(UserBase):
+    model_config = ConfigDict(extra="forbid")
+
     password: str
 
 
 class User(UserBase):
     id: int
-    is_active: bool = True
-
-    class Config:
-        from_attributes = True 
\ No newline at end of file
+    is_active: bool = True
\ No newline at end of file
@@ -1,14 +1,27 @@
+import logging
+from typing import Final
+
+import orjson
+
 from app_fastapi.schemas.event import EventSchema
 
+logger = logging.getLogger(__name__)
+
+# The service result is constant, so it is pre-serialized once for the endpoint
+_RESULT: Final[dict] = {"message": "Data received and processed by the service!"}
+RESULT_BYTES: Final[bytes] = orjson.dumps(_RESULT)
 
-def handle_event_logic(data: EventSchema):
+
+def handle_event_logic(data: EventSchema) -> None:
     """
     This is where you would implement the core business logic for handling the event.
     For example, processing data, triggering other services, etc.
     """
-    # Print the data
-    print("Event received in service layer:")
-    print(data)
-
-    # The service can return a result, which the endpoint can then use in its response.
-    return {"message": "Data received and processed by the service!"} 
\ No newline at end of file
+    # Log the data (only formatted when DEBUG logging is enabled)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Event received in service layer: event_id=%s event_type=%s event_data=%s",
+            data.event_id,
+            data.event_type,
+            bytes(data.event_data).decode(),  # Raw JSON text of the payload
+        )
\ No newline at end of file
@@ -1,5 +1,5 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlalchemy.ext.declarative import declarative_base
 import os
 from dotenv import load_dotenv
@@ -9,16 +9,34 @@ load_dotenv()
 # Database connection string
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Swap the sync drivers for their async counterparts so queries don't block the event loop
+ASYNC_DATABASE_URL = (
+    SQLALCHEMY_DATABASE_URL
+    .replace("postgresql://", "postgresql+asyncpg://", 1)
+    .replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connection pool settings (blank values in .env count as unset)
+# Set DATABASE_POOL=null when connecting through an external pooler such as pgbouncer,
+# so connections aren't pooled twice
+if os.getenv("DATABASE_POOL") == "null":
+    pool_options = {"poolclass": NullPool}
+else:
+    pool_options = {
+        "pool_size": int(os.getenv("DATABASE_POOL_SIZE") or "20"),
+        "max_overflow": int(os.getenv("DATABASE_MAX_OVERFLOW") or "10"),
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": 3600,
+    }
+
+engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options)
+
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 # Dependency for retrieving the DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
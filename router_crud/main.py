@@ -1,14 +1,24 @@
 # main.py
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 import users
 
 import models
 from database import engine
 
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables on startup (the async engine needs run_sync for metadata DDL)
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    yield
+    await engine.dispose()
 
-app = FastAPI(title="My API")
+# ORJSONResponse: serialize responses with orjson instead of the stdlib json module
+app = FastAPI(title="My API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Include the router
 app.include_router(users.router)
@@ -1,15 +1,22 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from pydantic import BaseModel
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, status, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from typing import Annotated, List
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import orjson
 import models
-from database import get_db
+from database import SessionLocal, get_db
+from exceptions import raise_user_not_found
 
 router = APIRouter(
     prefix="/users",
     tags=["users"]
 )
 
+# Type alias for the database session dependency
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+
 # Pydantic models
 class UserBase(BaseModel):
     name: str
@@ -22,50 +29,79 @@ class User(UserBase):
     id: int
     is_active: bool
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Number of rows fetched from the database cursor at a time when streaming
+USERS_STREAM_BATCH_SIZE = 500
+
+async def stream_users_json():
+    """Yield the users table as a JSON array, one batch of rows at a time"""
+    # The generator runs while the response is being sent, so it owns its session
+    async with SessionLocal() as db:
+        stmt = select(models.User).execution_options(yield_per=USERS_STREAM_BATCH_SIZE)
+        result = await db.stream_scalars(stmt)
+        yield b"["
+        first = True
+        async for partition in result.partitions():
+            for db_user in partition:
+                row = orjson.dumps(User.model_validate(db_user).model_dump())
+                yield row if first else b"," + row
+                first = False
+        yield b"]"
 
-@router.get("/", response_model=List[User])
-async def get_users(db: Session = Depends(get_db)):
-    """Get all users"""
-    return db.query(models.User).all()
+# The StreamingResponse is returned as-is, so the schema is declared through
+# `responses` to keep it in the OpenAPI docs
+@router.get("/", responses={200: {"model": List[User]}})
+async def get_users():
+    """
+    Get all users (streamed, so memory stays flat regardless of table size)
+
+    The rows are read through their own SessionLocal() session rather than the
+    get_db dependency, so dependency overrides of get_db don't apply here
+    """
+    return StreamingResponse(stream_users_json(), media_type="application/json")
 
 @router.get("/{user_id}", response_model=User)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, db: db_dependency):
     """Get a specific user by ID"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+        raise_user_not_found()
     return user
 
 @router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: db_dependency):
     """Create a new user"""
-    db_user = models.User(**user.dict())
+    db_user = models.User(**user.model_dump())
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    # The INSERT already populates the new id; expire_on_commit=False keeps the
+    # loaded attributes, so no refresh SELECT is needed
+    await db.commit()
     return db_user
 
 @router.put("/{user_id}", response_model=User)
-async def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
+async def update_user(user_id: int, user: UserCreate, db: db_dependency):
     """Update an existing user"""
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    # Single UPDATE ... RETURNING instead of SELECT then UPDATE
+    result = await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(name=user.name, email=user.email)
+        .returning(models.User)
+    )
+    db_user = result.scalar_one_or_none()
     if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
+        raise_user_not_found()
     
-    db_user.name = user.name
-    db_user.email = user.email
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     return db_user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: int, db: Session = Depends(get_db)):
+async def delete_user(user_id: int, db: db_dependency):
     """Delete a user"""
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # Single DELETE; rowcount tells us whether the user existed
+    result = await db.execute(delete(models.User).where(models.User.id == user_id))
+    if result.rowcount == 0:
+        raise_user_not_found()
     
-    db.delete(db_user)
-    db.commit()
\ No newline at end of file
+    await db.commit()
\ No newline at end of file
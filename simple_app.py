@@ -1,12 +1,13 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
 """
 This is a simple FastAPI app that uses a linear regression model to predict a score based on two features.
 """
 
-# Create a FastAPI app instance
-app = FastAPI()
+# Create a FastAPI app instance (responses are serialized with orjson)
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Define request body structure
 class InputData(BaseModel):
@@ -25,8 +26,8 @@ def predict(data: InputData):
     # Simulate prediction logic (e.g., ML model)
     score = data.feature1 * 0.6 + data.feature2 * 0.4
 
-    # model_dump() is used to convert the input data to a dictionary
-    return {"input": data.model_dump(), "prediction": score}
+    # Build the input dictionary directly from the fields (cheaper than model_dump())
+    return {"input": {"feature1": data.feature1, "feature2": data.feature2}, "prediction": score}
 
 # Run the app
 if __name__ == "__main__":
@@ -2,16 +2,26 @@
 Authentication Utilities
 Handles password hashing, JWT token creation/validation, and user authentication
 """
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional
-from fastapi import Depends, HTTPException, status
+from typing import Annotated, Optional
+from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt  # python-jose library for JWT
 from passlib.context import CryptContext  # For password hashing
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import bcrypt  # Raw bcrypt API, used for constant-time verification
+import base64
+import hashlib
+import hmac
+import orjson  # Fast JSON encoder for the token payload
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from . import models, schemas
+from . import cache, models, schemas
+from .exceptions import raise_credentials_exception
 from .database import get_db
 
 load_dotenv()
@@ -23,13 +33,85 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"  # HMAC with SHA-256
 ACCESS_TOKEN_EXPIRE_MINUTES = 30  # Token valid for 30 minutes
 
+# Precomputed pieces of every HS256 token: the base64url-encoded header
+# (it never changes) and the secret key as bytes for HMAC signing
+_JWT_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+_SECRET_BYTES = SECRET_KEY.encode("utf-8") if SECRET_KEY else b""
+
+def _b64url(data: bytes) -> bytes:
+    """Base64url-encode without padding (as required by the JWT spec)"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
 # ============ Password Hashing ============
 
-# CryptContext handles password hashing with bcrypt
-# bcrypt is a one-way hash - you can't decrypt it
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# CryptContext handles password hashing (one-way - you can't decrypt it)
+# New hashes use argon2id: memory-hard (resists GPU brute force) and, with these
+# settings (OWASP's recommended minimum), much faster per login than bcrypt's default 12 rounds
+# bcrypt stays in the list so existing hashes still verify; deprecated="auto"
+# marks them for upgrade to argon2 on the user's next successful login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__time_cost=2,
+    argon2__memory_cost=19_456,  # KiB (19 MiB)
+    argon2__parallelism=1,
+)
+
+# ============ Password Verification Cache ============
+
+# Hashing is deliberately slow (~tens of ms), which adds up when the same
+# credentials log in over and over (service accounts, test suites)
+# Successful verifications are remembered in a small per-process LRU cache
+# - Keys are an HMAC-SHA256 of (password, hash) under a random per-process key,
+#   so the cache never stores plain passwords
+# - Only successful checks are cached, so wrong guesses always pay the full cost
+# - Set PASSWORD_VERIFY_CACHE_SIZE=0 to disable (e.g. under memory pressure);
+#   don't share this cache across untrusted tenants
+_VERIFY_CACHE_MAX = int(os.getenv("PASSWORD_VERIFY_CACHE_SIZE", "1024"))
+_VERIFY_CACHE_KEY = os.urandom(32)
+_verify_cache: "OrderedDict[bytes, bool]" = OrderedDict()
+_verify_cache_lock = threading.Lock()
+
+def _verify_cache_key(plain_password: str, hashed_password: str) -> bytes:
+    message = plain_password.encode("utf-8") + b"|" + hashed_password.encode("utf-8")
+    return hmac.new(_VERIFY_CACHE_KEY, message, hashlib.sha256).digest()
+
+def clear_verify_cache() -> None:
+    """Forget all cached verifications (call when a password is changed)"""
+    with _verify_cache_lock:
+        _verify_cache.clear()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a plain text password against a hashed password,
+    reusing the result of a recent successful verification if there is one
+    
+    Args:
+        plain_password: The password user entered (plain text)
+        hashed_password: The hashed password from database
+    
+    Returns:
+        True if password matches, False otherwise
+    """
+    if _VERIFY_CACHE_MAX <= 0:
+        return _verify_password_uncached(plain_password, hashed_password)
+    
+    cache_key = _verify_cache_key(plain_password, hashed_password)
+    with _verify_cache_lock:
+        if cache_key in _verify_cache:
+            _verify_cache.move_to_end(cache_key)  # Mark as recently used
+            return True
+    
+    if not _verify_password_uncached(plain_password, hashed_password):
+        return False
+    
+    with _verify_cache_lock:
+        _verify_cache[cache_key] = True
+        while len(_verify_cache) > _VERIFY_CACHE_MAX:
+            _verify_cache.popitem(last=False)  # Evict least recently used
+    return True
+
+def _verify_password_uncached(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain text password against a hashed password
     
@@ -39,8 +121,30 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     
     Returns:
         True if password matches, False otherwise
+    
+    For legacy bcrypt hashes, the candidate hash is recomputed with the stored
+    salt and compared with hmac.compare_digest, which always checks every byte
+    (no early exit that could leak timing information)
+    """
+    if not hashed_password.startswith("$2"):
+        # argon2 hashes - argon2's own verify already compares in constant time
+        return pwd_context.verify(plain_password, hashed_password)
+    
+    stored_hash = hashed_password.encode("utf-8")
+    try:
+        # bcrypt only uses the first 72 bytes of the password (same as passlib)
+        candidate_hash = bcrypt.hashpw(plain_password.encode("utf-8")[:72], stored_hash)
+    except ValueError:
+        # Stored value isn't a valid bcrypt hash
+        return False
+    return hmac.compare_digest(candidate_hash, stored_hash)
+
+def password_needs_rehash(hashed_password: str) -> bool:
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    Check whether a stored hash uses an old scheme or settings (e.g. bcrypt)
+    and should be replaced with a fresh argon2 hash
+    """
+    return pwd_context.needs_update(hashed_password)
 
 def get_password_hash(password: str) -> str:
     """
@@ -81,12 +185,60 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     
-    # Add expiration to payload
-    to_encode.update({"exp": expire})
+    # Add expiration to payload (JWT "exp" is seconds since the epoch)
+    to_encode.update({"exp": int(expire.timestamp())})
+    
+    if not _SECRET_BYTES:
+        raise RuntimeError("SECRET_KEY is not set")
     
-    # Encode and sign the JWT
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    # Encode and sign the JWT directly with HMAC-SHA256
+    # (same output format as jwt.encode, without rebuilding the header each time)
+    signing_input = _JWT_HEADER_B64 + b"." + _b64url(orjson.dumps(to_encode))
+    signature = hmac.new(_SECRET_BYTES, signing_input, hashlib.sha256).digest()
+    encoded_jwt = signing_input + b"." + _b64url(signature)
+    return encoded_jwt.decode("ascii")
+
+# ============ Decoded Token Cache ============
+
+# The same token is sent on every request of a session, so keep recently
+# verified payloads in a small LRU cache (token -> (expiry, payload))
+# Entries are dropped once expired or when the cache is full
+_TOKEN_CACHE_MAX = 4096
+_token_cache: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+_token_cache_lock = threading.Lock()  # Held briefly on the event loop; also guards any calls from threads
+
+def decode_access_token(token: str) -> dict:
+    """
+    Decode and verify a JWT, reusing the cached payload for recently seen tokens
+    
+    Raises:
+        JWTError: If the token is invalid or expired
+    """
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+        if entry is not None:
+            if entry[0] > time.time():
+                _token_cache.move_to_end(token)  # Mark as recently used
+                return entry[1]
+            del _token_cache[token]  # Expired
+    
+    # Cache miss - verify signature and claims
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    
+    with _token_cache_lock:
+        _token_cache[token] = (payload["exp"], payload)
+        while len(_token_cache) > _TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)  # Evict least recently used
+    return payload
+
+# ============ Token -> User Cache ============
+
+# How long a token's user id stays cached in Redis (seconds)
+USER_CACHE_TTL = 60
+
+def _user_cache_key(token: str) -> str:
+    # Key on a digest so raw tokens are never stored in Redis
+    return "auth:token:" + hashlib.sha256(token.encode()).hexdigest()
 
 # ============ OAuth2 Authentication Scheme ============
 
@@ -94,24 +246,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 # tokenUrl="/token" tells FastAPI where to get tokens (for API docs)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),  # Extract token from header
-    db: Session = Depends(get_db)  # Get database session
+# Type aliases for dependency injection (same Annotated pattern as the routes)
+token_dependency = Annotated[str, Depends(oauth2_scheme)]  # Token from Authorization header
+db_dependency = Annotated[AsyncSession, Depends(get_db)]  # Database session
+
+def _token_payload(token: str) -> dict:
+    """Verify the JWT and return its payload (raises 401 if invalid or without a username)"""
+    try:
+        # Decode JWT token (cached for recently verified tokens)
+        payload = decode_access_token(token)
+    except JWTError:
+        # Token is invalid (expired, wrong signature, malformed, etc.)
+        payload = None
+    if payload is None or payload.get("sub") is None:
+        raise_credentials_exception()
+    return payload
+
+async def get_current_user(
+    token: token_dependency,  # Extract token from header
+    db: db_dependency,  # Get database session
 ) -> models.User:
     """
     Get the current authenticated user from JWT token
     
     This is used as a dependency in protected endpoints:
     @router.get("/protected")
-    def protected_route(current_user: User = Depends(get_current_user)):
+    async def protected_route(current_user: User = Depends(get_current_user)):
         ...
     
+    Endpoints that only need the user's id should use get_current_user_id,
+    which can skip the database entirely
+    
     Args:
         token: JWT token from Authorization header (extracted automatically)
         db: Database session (injected automatically)
     
     Returns:
-        User object from database
+        User object from database (all columns loaded)
     
     Raises:
         HTTPException: If token is invalid or user not found
@@ -123,37 +294,56 @@ def get_current_user(
     4. Look up user in database
     5. Return user object
     """
-    # Exception to raise if authentication fails
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},  # Tell client to use Bearer token
-    )
+    payload = _token_payload(token)
     
-    try:
-        # Decode JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        
-        # Extract username from payload (stored in "sub" claim)
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        
-        # Create TokenData object for validation
-        token_data = schemas.TokenData(username=username)
-        
-    except JWTError:
-        # Token is invalid (expired, wrong signature, malformed, etc.)
-        raise credentials_exception
+    # Create TokenData object for validation
+    token_data = schemas.TokenData(username=payload["sub"])
     
     # Look up user in database
-    user = db.query(models.User).filter(
-        models.User.username == token_data.username
-    ).first()
+    user = await db.scalar(
+        select(models.User).where(models.User.username == token_data.username)
+    )
     
     if user is None:
         # User in token doesn't exist in database (maybe deleted)
-        raise credentials_exception
+        raise_credentials_exception()
     
     # Return authenticated user
     return user
+
+async def get_current_user_id(
+    token: token_dependency,  # Extract token from header
+    db: db_dependency,  # Get database session
+) -> int:
+    """
+    Get the id of the current authenticated user from JWT token
+    
+    Same checks as get_current_user, but the id is cached in Redis per token
+    (when REDIS_URL is configured), so repeat requests skip the user SELECT
+    
+    Raises:
+        HTTPException: If token is invalid or user not found
+    """
+    payload = _token_payload(token)
+    
+    # Fast path: user id cached in Redis for this token
+    cache_key = _user_cache_key(token)
+    user_id = await cache.get_cached(cache_key)
+    if user_id is not None:
+        return int(user_id)
+    
+    # Look up the user's id in database
+    user_id = await db.scalar(
+        select(models.User.id).where(models.User.username == payload["sub"])
+    )
+    
+    if user_id is None:
+        # User in token doesn't exist in database (maybe deleted)
+        raise_credentials_exception()
+    
+    # Cache the id, but never past the token's expiry
+    ttl = min(USER_CACHE_TTL, int(payload["exp"] - time.time()))
+    if ttl > 0:
+        await cache.set_cached(cache_key, user_id, ttl)
+    
+    return user_id
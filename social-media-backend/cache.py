@@ -0,0 +1,69 @@
+"""
+Response Cache
+Small helpers around the optional Redis client for caching feed responses
+"""
+import logging
+import time
+
+from .database import redis_client
+
+try:
+    from redis.exceptions import RedisError
+except ImportError:  # redis not installed - caching is disabled anyway
+    RedisError = Exception
+
+logger = logging.getLogger(__name__)
+
+# How long cached feed pages live (seconds)
+FEED_CACHE_TTL = 30
+
+# Redis ZSET holding the keys of every cached feed page (score = expiry time),
+# so they can all be deleted at once when posts change (avoids scanning the keyspace)
+# Entries of expired pages are pruned on each write and the set itself expires
+# with the newest page, so it stays bounded under read-only traffic
+FEED_KEYS_SET = "posts:feed:pages"
+
+async def get_cached(key: str):
+    """Return the cached bytes for key, or None on a miss / when caching is off"""
+    if redis_client is None:
+        return None
+    try:
+        return await redis_client.get(key)
+    except RedisError:
+        # A cache outage should never break the endpoint - fall back to the DB
+        logger.warning("Redis GET failed for %s", key, exc_info=True)
+        return None
+
+async def set_cached(key: str, value, ttl: int) -> None:
+    """Cache a value for ttl seconds"""
+    if redis_client is None:
+        return
+    try:
+        await redis_client.setex(key, ttl, value)
+    except RedisError:
+        logger.warning("Redis SETEX failed for %s", key, exc_info=True)
+
+async def set_cached_feed(key: str, value: bytes) -> None:
+    """Cache a serialized feed page for FEED_CACHE_TTL seconds"""
+    if redis_client is None:
+        return
+    try:
+        now = time.time()
+        pipe = redis_client.pipeline()
+        pipe.setex(key, FEED_CACHE_TTL, value)
+        pipe.zadd(FEED_KEYS_SET, {key: now + FEED_CACHE_TTL})
+        pipe.zremrangebyscore(FEED_KEYS_SET, "-inf", now)  # Drop pages that have expired
+        pipe.expire(FEED_KEYS_SET, FEED_CACHE_TTL)  # Every listed page has expired by then
+        await pipe.execute()
+    except RedisError:
+        logger.warning("Redis SETEX failed for %s", key, exc_info=True)
+
+async def invalidate_feeds() -> None:
+    """Drop every cached feed page (call after any change to posts, likes or retweets)"""
+    if redis_client is None:
+        return
+    try:
+        keys = await redis_client.zrange(FEED_KEYS_SET, 0, -1)
+        await redis_client.delete(FEED_KEYS_SET, *keys)
+    except RedisError:
+        logger.warning("Redis feed invalidation failed", exc_info=True)
\ No newline at end of file
@@ -1,22 +1,54 @@
 # SQLAlchemy imports for database setup
-from sqlalchemy import create_engine  # Creates connection to database
+from sqlalchemy import event  # Hooks into connection events
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # Async engine and session factory
 from sqlalchemy.ext.declarative import declarative_base  # Base class for models
-from sqlalchemy.orm import sessionmaker  # Factory for creating database sessions
+import os
 
 # Database connection string - using SQLite (a file-based database)
 # The .db file will be created in the current directory
-SQLALCHEMY_DATABASE_URL = "sqlite:///./microblog.db"
+# aiosqlite: async driver, so queries don't block the event loop
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./microblog.db"
 
-# Create the database engine - the core interface to the database
-# check_same_thread=False allows SQLite to work with FastAPI's async nature
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# Create the async database engine - the core interface to the database
+# Pool settings: the defaults (5 connections + 10 overflow) run out under bursts
+# of concurrent requests, so size the pool explicitly
+# pool_pre_ping: check a connection is alive before handing it out
+# pool_recycle: replace connections older than an hour
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=True,
+    pool_recycle=3600,
 )
 
-# SessionLocal is a factory that creates database sessions
-# autocommit=False: Changes aren't automatically saved (we control when to commit)
+# SQLite tuning, applied to every new connection
+# journal_mode=WAL: readers don't block the writer (and vice versa)
+# synchronous=NORMAL: safe with WAL and avoids an fsync on every commit
+# temp_store/mmap_size/cache_size: keep temp tables, file pages and cache in memory
+@event.listens_for(engine.sync_engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # Disable the sqlite3 module's own transaction handling - SQLAlchemy emits BEGIN below
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.execute("PRAGMA cache_size=-64000")    # ~64 MB
+    cursor.close()
+
+# Start transactions explicitly since the driver no longer does it for us
+@event.listens_for(engine.sync_engine, "begin")
+def do_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+# SessionLocal is a factory that creates async database sessions
 # autoflush=False: Changes aren't automatically sent to DB before queries
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: objects stay readable after commit (an expired
+# attribute would need an implicit reload, which async sessions can't do)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 # Base class that all our database models (User, Post, etc.) will inherit from
 # This allows SQLAlchemy to track our models and create tables
@@ -24,9 +56,18 @@ Base = declarative_base()
 
 # Dependency function that provides a database session to route handlers
 # This is used with FastAPI's Depends() to inject DB sessions into endpoints
-def get_db():
-    db = SessionLocal()  # Create a new database session
-    try:
-        yield db  # Provide the session to the endpoint
-    finally:
-        db.close()  # Always close the session when done (cleanup)
\ No newline at end of file
+async def get_db():
+    async with SessionLocal() as db:  # Create a new database session
+        yield db  # Provide the session to the endpoint (closed automatically when done)
+
+# ============ Redis (optional cache) ============
+
+# Redis is used to cache hot read endpoints (e.g. the post feeds)
+# Caching is only enabled when REDIS_URL is set, e.g. REDIS_URL=redis://localhost:6379/0
+# Without it (or without the redis package installed) the app just queries the database
+REDIS_URL = os.getenv("REDIS_URL")
+
+redis_client = None
+if REDIS_URL:
+    import redis.asyncio as redis  # Optional dependency - only needed when caching is enabled
+    redis_client = redis.Redis.from_url(REDIS_URL)  # Async client, so cache calls don't block the event loop
@@ -26,4 +26,16 @@ def raise_unauthorized_exception(detail: str = "Incorrect username or password")
 
 # 409 Conflict - Resource already exists (e.g., duplicate username)
 def raise_conflict_exception(detail: str = "Conflict occurred"):
-    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
\ No newline at end of file
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+# 404 Not Found - shortcut for the "User not found" case
+def raise_user_not_found():
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+# 401 Unauthorized - JWT token is missing, invalid, expired, or its user no longer exists
+def raise_credentials_exception():
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
@@ -0,0 +1,192 @@
+"""
+Per-User Timelines (fan-out on write)
+Each user's timeline is precomputed in Redis as a sorted set of post IDs.
+New posts are pushed into the followers' timelines when they're created, so
+reading a timeline never has to join the follows table
+
+A timeline is only read once it has been built in full from the database
+(rebuild_feed). Pushes only add to timelines that already exist, and a
+timeline is dropped whenever it can no longer be kept in sync incrementally
+(the user follows or unfollows someone); the next read rebuilds it
+
+Redis keys:
+- user:<user_id>:feed  ZSET of post IDs (score = post ID, so newest first
+                       matches ORDER BY timestamp DESC, id DESC)
+                       An empty timeline holds only EMPTY_MARKER, so it still counts as built
+- post:<post_id>       JSON body of the post
+
+Both expire after FEED_TTL, so timelines and bodies of inactive users and
+old posts don't accumulate. A timeline entry whose body has expired makes
+the timeline count as stale, and it is rebuilt
+
+All functions are no-ops (or return None) when Redis isn't configured
+"""
+import logging
+from typing import List, Optional
+
+import orjson
+from sqlalchemy import or_, select
+
+from . import models, schemas
+from .cache import RedisError
+from .database import SessionLocal, redis_client
+
+logger = logging.getLogger(__name__)
+
+# Keep only the newest N entries per timeline to bound memory
+FEED_MAX_LENGTH = 1000
+
+# How long timelines and post bodies live without being rebuilt (seconds)
+FEED_TTL = 24 * 60 * 60
+
+# Placeholder member of a built timeline with no posts (post IDs start at 1)
+EMPTY_MARKER = 0
+
+def _feed_key(user_id: int) -> str:
+    return f"user:{user_id}:feed"
+
+def _post_key(post_id: int) -> str:
+    return f"post:{post_id}"
+
+def _post_body(post: schemas.Post) -> bytes:
+    return orjson.dumps(post.model_dump(mode="json"))
+
+def timeline_query(user_id: int):
+    """Posts by user_id and everyone they follow, newest first"""
+    followee_ids = select(models.Follow.c.followee_id).where(
+        models.Follow.c.follower_id == user_id
+    )
+    return (
+        select(models.Post)
+        .where(or_(models.Post.owner_id == user_id, models.Post.owner_id.in_(followee_ids)))
+        .order_by(models.Post.timestamp.desc(), models.Post.id.desc())  # id breaks ties within a second
+    )
+
+async def _follower_ids(user_id: int) -> List[int]:
+    """Look up who follows user_id (runs in a background task, so it opens its own session)"""
+    async with SessionLocal() as db:
+        rows = await db.scalars(
+            select(models.Follow.c.follower_id).where(models.Follow.c.followee_id == user_id)
+        )
+        return list(rows)
+
+async def rebuild_feed(user_id: int) -> None:
+    """
+    Build the user's timeline from the database (newest FEED_MAX_LENGTH posts)
+    Meant to run as a background task after a read missed the timeline
+    """
+    if redis_client is None:
+        return
+    async with SessionLocal() as db:
+        posts = [
+            schemas.Post.model_validate(post)
+            for post in await db.scalars(timeline_query(user_id).limit(FEED_MAX_LENGTH))
+        ]
+    key = _feed_key(user_id)
+    try:
+        # MULTI/EXEC so readers never see a half-built timeline
+        pipe = redis_client.pipeline(transaction=True)
+        for post in posts:
+            pipe.set(_post_key(post.id), _post_body(post), ex=FEED_TTL)
+        pipe.delete(key)
+        if posts:
+            pipe.zadd(key, {post.id: post.id for post in posts})
+        else:
+            pipe.zadd(key, {EMPTY_MARKER: EMPTY_MARKER})  # Nothing to show, but built
+        pipe.expire(key, FEED_TTL)
+        await pipe.execute()
+    except RedisError:
+        logger.warning("Feed rebuild failed for user %s", user_id, exc_info=True)
+
+async def drop_feed(user_id: int) -> None:
+    """Forget the user's timeline (e.g. after a follow/unfollow); the next read rebuilds it"""
+    if redis_client is None:
+        return
+    try:
+        await redis_client.delete(_feed_key(user_id))
+    except RedisError:
+        logger.warning("Feed drop failed for user %s", user_id, exc_info=True)
+
+async def push_to_followers(post: schemas.Post) -> None:
+    """
+    Store the post body and add it to the author's and each follower's timeline
+    (only timelines that have been built - missing ones are rebuilt on read)
+    Meant to run as a background task after the post is committed
+    """
+    if redis_client is None:
+        return
+    user_ids = [post.owner_id, *await _follower_ids(post.owner_id)]
+    try:
+        # Find which timelines exist (one round trip)
+        pipe = redis_client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.exists(_feed_key(user_id))
+        built = [user_id for user_id, found in zip(user_ids, await pipe.execute()) if found]
+        if not built:
+            return
+
+        # Add the post to those timelines (one round trip for all followers)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(_post_key(post.id), _post_body(post), ex=FEED_TTL)
+        for user_id in built:
+            key = _feed_key(user_id)
+            pipe.zrem(key, EMPTY_MARKER)  # No longer empty
+            pipe.zadd(key, {post.id: post.id})
+            pipe.zremrangebyrank(key, 0, -FEED_MAX_LENGTH - 1)  # Trim to the newest entries
+        await pipe.execute()
+    except RedisError:
+        logger.warning("Feed fan-out failed for post %s", post.id, exc_info=True)
+
+async def remove_from_followers(post_id: int, owner_id: int) -> None:
+    """Remove a deleted post from the author's and each follower's timeline"""
+    if redis_client is None:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(_post_key(post_id))
+        for user_id in [owner_id, *await _follower_ids(owner_id)]:
+            pipe.zrem(_feed_key(user_id), post_id)
+        await pipe.execute()
+    except RedisError:
+        logger.warning("Feed removal failed for post %s", post_id, exc_info=True)
+
+async def update_post_body(post: schemas.Post) -> None:
+    """Refresh the stored body of an edited post (only if it's already stored)"""
+    if redis_client is None:
+        return
+    try:
+        await redis_client.set(_post_key(post.id), _post_body(post), xx=True, keepttl=True)
+    except RedisError:
+        logger.warning("Feed update failed for post %s", post.id, exc_info=True)
+
+async def read_feed(user_id: int, skip: int, limit: int) -> Optional[bytes]:
+    """
+    Return a page of the user's timeline as a JSON array (newest first),
+    or None if Redis isn't configured or the timeline isn't built / is stale
+    (the caller then falls back to the database and schedules rebuild_feed)
+    """
+    if redis_client is None:
+        return None
+    key = _feed_key(user_id)
+    try:
+        # Timeline size and the requested page in one round trip
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zcard(key)
+        pipe.zrevrange(key, skip, skip + limit - 1)
+        size, post_ids = await pipe.execute()
+        if size == 0:
+            return None  # Not built yet
+        # Only the newest FEED_MAX_LENGTH posts are kept - older pages come from the database
+        if skip + limit > size and size >= FEED_MAX_LENGTH:
+            return None
+        post_ids = [post_id for post_id in post_ids if int(post_id) != EMPTY_MARKER]
+        if not post_ids:
+            return b"[]"
+        bodies = await redis_client.mget([_post_key(int(post_id)) for post_id in post_ids])
+    except RedisError:
+        logger.warning("Feed read failed for user %s", user_id, exc_info=True)
+        return None
+    # A body expired (or its post is mid-deletion) - treat the timeline as stale
+    if any(body is None for body in bodies):
+        return None
+    return b"[" + b",".join(bodies) + b"]"
@@ -2,19 +2,32 @@
 Main FastAPI Application Entry Point
 This file initializes the FastAPI app and connects all the routes
 """
+from contextlib import asynccontextmanager
+import os
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
 from .database import engine  # Database engine for SQLAlchemy
 from .models import Base       # Base class for all database models
 from .routes import users, posts, auth  # Import route modules
 
-# Create all database tables based on the models (User, Post, Like, Retweet)
-# This runs once when the app starts and creates tables if they don't exist
-Base.metadata.create_all(bind=engine)
+# Lifespan handler - runs once when the server starts (not on import)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create all database tables based on the models (User, Post, Like, Retweet)
+    # Creates tables if they don't exist; enabled by default for local development
+    # In production, set RUN_MIGRATIONS=0 on the workers and create the schema once
+    # in a separate deploy step, so N workers don't each inspect every table on boot
+    if os.getenv("RUN_MIGRATIONS", "1") == "1":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    yield
 
 # Initialize the FastAPI application
-app = FastAPI()
+# ORJSONResponse: serialize responses with orjson instead of the stdlib json module
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Include routers - this connects all the endpoint handlers to the app
 # Each router handles different parts of the API:
@@ -5,11 +5,24 @@ from sqlalchemy import (
     String,      # String/text data type
     DateTime,    # Date and time data type
     ForeignKey,  # Creates relationships between tables
-    Table        # Defines a table
+    Table,       # Defines a table
+    Index        # Defines an index on one or more columns
 )
+from sqlalchemy.dialects import sqlite  # SQLite-specific column types
 from sqlalchemy.orm import relationship  # Defines relationships between models
+from sqlalchemy.sql import func  # SQL functions (used for DB-side timestamps)
 from .database import Base  # Base class all models inherit from
-from datetime import datetime, timezone
+
+# DB-set timestamp column type
+# SQLite's CURRENT_TIMESTAMP stores whole seconds as "YYYY-MM-DD HH:MM:SS" text;
+# bind datetimes in the same format so comparisons against stored values
+# (e.g. the posts pagination cursor) compare like with like
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
 
 # Association table for many-to-many relationship (User follows User)
 # This is a junction table - it doesn't need its own model class
@@ -21,11 +34,17 @@ Follow = Table(
     Column("follower_id", Integer, ForeignKey("users.id"), primary_key=True),
     # followee_id: the user who is being followed
     Column("followee_id", Integer, ForeignKey("users.id"), primary_key=True),
+    # The primary key (follower_id, followee_id) only helps "who does X follow"
+    # This reverse index makes "who follows X" an index-only lookup too
+    Index("ix_follows_followee", "followee_id", "follower_id"),
 )
 
 # User Model - represents the users table in the database
 class User(Base):
     __tablename__ = "users"  # Actual table name in the database
+    # eager_defaults: fetch server-generated values (created_at) with INSERT ... RETURNING
+    # on flush, rather than with a separate SELECT when they're first accessed
+    __mapper_args__ = {"eager_defaults": True}
 
     # Primary key - unique identifier for each user
     id = Column(Integer, primary_key=True, index=True)
@@ -40,28 +59,49 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     
     # Timestamp of when the user account was created
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    # server_default=func.now(): the database fills this in on INSERT (per row),
+    # instead of a Python value evaluated once when the module was imported
+    created_at = Column(Timestamp, server_default=func.now())
 
     # Relationship: One user can have many posts
     # back_populates creates a two-way relationship with Post.owner
+    # Loaded lazily - this user object is fetched on every authenticated request,
+    # so eagerly loading all posts here would add work to every call
+    # (list queries use options(selectinload(...)) when they need posts)
     posts = relationship("Post", back_populates="owner")
 
     # Self-referential many-to-many relationship for follow system
     # secondary=Follow: uses the Follow table to connect users
     # primaryjoin: when this user is being followed (they are the followee)
     # secondaryjoin: when this user is following others (they are the follower)
-    # backref="following": creates a reverse relationship automatically
+    # back_populates="following": links to the reverse relationship below
+    # (declared explicitly instead of backref so each side can pick its own loading strategy)
     followers = relationship(
         "User",
         secondary=Follow,
         primaryjoin=id == Follow.c.followee_id,
         secondaryjoin=id == Follow.c.follower_id,
-        backref="following",
+        back_populates="following",
+    )
+
+    # Reverse side: users this user is following
+    following = relationship(
+        "User",
+        secondary=Follow,
+        primaryjoin=id == Follow.c.follower_id,
+        secondaryjoin=id == Follow.c.followee_id,
+        back_populates="followers",
     )
 
 # Post Model - represents posts/tweets in the database
 class Post(Base):
     __tablename__ = "posts"  # Table name in database
+    __table_args__ = (
+        # Per-user timelines (filter by owner, sort by time) become an index range scan
+        Index("ix_posts_owner_timestamp", "owner_id", "timestamp"),
+    )
+    # Fetch the server-generated timestamp in the INSERT itself (see User)
+    __mapper_args__ = {"eager_defaults": True}
 
     # Primary key - unique identifier for each post
     id = Column(Integer, primary_key=True, index=True)
@@ -69,15 +109,25 @@ class Post(Base):
     # Post content - limited to 280 characters (like Twitter), cannot be null
     content = Column(String(280), nullable=False)
     
-    # When the post was created
-    timestamp = Column(DateTime, default=datetime.now(timezone.utc))
+    # When the post was created (set by the database on INSERT)
+    timestamp = Column(Timestamp, server_default=func.now())
     
     # Foreign key - links this post to the user who created it
     # References the id column in the users table
     owner_id = Column(Integer, ForeignKey("users.id"))
 
+    # Denormalized engagement counters - kept up to date by the like/unlike and
+    # retweet/unretweet endpoints in the same transaction as the Like/Retweet row,
+    # so feeds can read the counts without aggregating the likes/retweets tables
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    retweets_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Relationship: each post belongs to one user (the owner)
-    owner = relationship("User", back_populates="posts")
+    # lazy="raise": no response serializes the owner, so it is never loaded by
+    # default (no JOIN to users on every post query); reading post.owner without
+    # asking for it raises instead of issuing a hidden SELECT per post
+    # Queries that do need it add .options(joinedload(models.Post.owner))
+    owner = relationship("User", back_populates="posts", lazy="raise")
     
     # Relationship: one post can have many likes
     likes = relationship("Like", back_populates="post")
@@ -85,9 +135,19 @@ class Post(Base):
     # Relationship: one post can have many retweets
     retweets = relationship("Retweet", back_populates="post")
 
+# Index for the global feed (ORDER BY timestamp DESC with pagination)
+# Defined after the class so it can use the column's .desc() expression
+# Per-user timelines use ix_posts_owner_timestamp; likes/retweets lookups by
+# post_id use ix_likes_post / ix_retweets_post (post_id is their first column)
+Index("ix_posts_timestamp_desc", Post.timestamp.desc())
+
 # Like Model - tracks which users liked which posts
 class Like(Base):
     __tablename__ = "likes"
+    __table_args__ = (
+        # Reverse of the primary key - "who liked post X" lookups
+        Index("ix_likes_post", "post_id", "user_id"),
+    )
 
     # Composite primary key (combination of user_id and post_id must be unique)
     # This ensures a user can only like a post once
@@ -101,13 +161,20 @@ class Like(Base):
 # Retweet Model - tracks which users retweeted which posts
 class Retweet(Base):
     __tablename__ = "retweets"
+    __table_args__ = (
+        # Reverse of the primary key - "who retweeted post X" lookups
+        Index("ix_retweets_post", "post_id", "user_id"),
+        # A user's retweets in time order (for timelines)
+        Index("ix_retweets_user_time", "user_id", "timestamp"),
+    )
 
     # Composite primary key - ensures a user can only retweet a post once
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
     post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
     
     # Track when the retweet happened (useful for timeline features)
-    timestamp = Column(DateTime, default=datetime.now(timezone.utc))
+    # Always filled in by the database (DEFAULT CURRENT_TIMESTAMP on INSERT)
+    timestamp = Column(Timestamp, server_default=func.now(), nullable=False)
 
     # Relationships to access the user and post objects
     user = relationship("User")
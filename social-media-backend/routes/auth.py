@@ -3,7 +3,9 @@ Authentication Routes
 Handles user login and token generation
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas, auth  # Import from parent package
 from ..database import get_db
@@ -21,13 +23,13 @@ router = APIRouter(
 
 # Type alias for database dependency injection
 # This is a modern Python typing pattern: Annotated[Type, metadata]
-# It means: "Session type with dependency injection of get_db()"
-db_dependency = Annotated[Session, Depends(get_db)]
+# It means: "AsyncSession type with dependency injection of get_db()"
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
 # ============ Login Endpoint ============
 # POST /token - User login to get access token
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token(
+async def login_for_access_token(
     db: db_dependency,  # Database session injected automatically
     form_data: OAuth2PasswordRequestForm = Depends()  # Standard OAuth2 form (username + password)
 ):
@@ -42,16 +44,33 @@ def login_for_access_token(
     5. Return token to client
     """
     # Query database for user with matching username
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
+    # Only the columns needed for login are selected - no full User object is built
+    user = (await db.execute(
+        select(models.User.username, models.User.hashed_password)
+        .where(models.User.username == form_data.username)
+    )).first()
     
     # Check if user exists AND password is correct
     # verify_password() compares plain password with hashed password
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    # Password hashing is CPU-bound, so it runs in the threadpool to keep the event loop free
+    if user is None or not await run_in_threadpool(
+        auth.verify_password, form_data.password, user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
     
+    # Upgrade legacy (bcrypt) hashes to argon2 now that we know the plain password
+    if auth.password_needs_rehash(user.hashed_password):
+        new_hash = await run_in_threadpool(auth.get_password_hash, form_data.password)
+        await db.execute(
+            update(models.User)
+            .where(models.User.username == user.username)
+            .values(hashed_password=new_hash)
+        )
+        await db.commit()
+    
     # Set token expiration time (e.g., 30 minutes)
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     
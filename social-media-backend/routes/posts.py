@@ -2,15 +2,21 @@
 Post Routes
 Handles all post-related operations: CRUD, likes, retweets, and feed queries
 """
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func  # SQL aggregate functions (COUNT, etc.)
-from typing import List, Annotated
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, exists, lambda_stmt, literal, select, tuple_, update  # SQL statement builders
+from sqlalchemy.dialects.sqlite import insert  # SQLite INSERT with ON CONFLICT support
+from typing import List, Annotated, Optional, Tuple
 from datetime import timedelta, datetime, timezone
+import base64  # Encodes the pagination cursor
+import orjson  # Fast JSON encoding for cached responses
 
 from .. import models, schemas, auth
 from ..database import get_db
 from .. import exceptions  # Import from parent package
+from .. import cache  # Optional Redis cache for the feeds
+from .. import feed  # Per-user timelines in Redis (fan-out on write)
 
 # Setup Router with /posts prefix
 router = APIRouter(
@@ -19,34 +25,110 @@ router = APIRouter(
 )
 
 # Type alias for dependency injection
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+
+# Largest page a client can ask for from the post list endpoints
+MAX_PAGE_SIZE = 100
+
+# ============ Pagination Cursor ============
+# The cursor is the (timestamp, id) of the last post on a page, base64url-encoded
+# so clients treat it as an opaque string
+def _encode_cursor(post: models.Post) -> str:
+    raw = f"{post.timestamp.isoformat()}|{post.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        ts, post_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), int(post_id)
+    except ValueError:  # Bad base64, bad UTF-8, wrong number of parts, bad date or id
+        exceptions.raise_bad_request_exception("Invalid cursor")
 
 # ============ Get Posts Endpoint ============
-# GET /posts/ - Retrieve a list of posts (paginated)
-@router.get("/", response_model=List[schemas.Post])
-def read_posts(db: db_dependency, skip: int = 0, limit: int = 10):
+# GET /posts/ - Retrieve a page of posts (cursor-paginated)
+@router.get("/", response_model=schemas.PostPage, response_class=ORJSONResponse)
+async def read_posts(
+    db: db_dependency,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+):
     """
-    Get posts with pagination
+    Get posts with cursor pagination
     
     Query parameters:
-    - skip: How many posts to skip (for pagination, default 0)
-    - limit: Max number of posts to return (default 10)
+    - cursor: next_cursor from the previous page (omit for the first page)
+    - limit: Max number of posts to return (default 10, at most 100)
+    
+    Returns posts ordered by most recent first, plus next_cursor
+    (None on the last page)
+    
+    Pages are cached in Redis for a short time (when REDIS_URL is configured)
+    """
+    # Serve from the cache if this page was computed recently
+    cache_key = f"posts:feed:{cursor or ''}:{limit}"
+    cached = await cache.get_cached(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    # Query posts, order by newest first (id breaks ties between equal timestamps)
+    # The cursor seeks straight to the rows after the previous page through the
+    # timestamp index, so deep pages cost the same as the first one (unlike OFFSET)
+    query = (
+        select(models.Post)
+        .order_by(models.Post.timestamp.desc(), models.Post.id.desc())
+        .limit(limit)
+    )
+    if cursor is not None:
+        query = query.where(tuple_(models.Post.timestamp, models.Post.id) < _decode_cursor(cursor))
+    posts = (await db.scalars(query)).all()
+    
+    # A full page means there may be more posts after it
+    next_cursor = _encode_cursor(posts[-1]) if posts and len(posts) == limit else None
+    
+    # Serialize once, cache it, and return the same bytes
+    body = orjson.dumps({
+        "posts": [schemas.Post.model_validate(p).model_dump(mode="json") for p in posts],
+        "next_cursor": next_cursor,
+    })
+    await cache.set_cached_feed(cache_key, body)
+    return Response(content=body, media_type="application/json")
+
+# ============ Personal Timeline Endpoint ============
+# GET /posts/feed/ - Posts from the users you follow (and your own), newest first
+@router.get("/feed/", response_model=List[schemas.Post], response_class=ORJSONResponse)
+async def read_feed(
+    db: db_dependency,
+    background_tasks: BackgroundTasks,
+    current_user_id: int = Depends(auth.get_current_user_id),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Get the current user's timeline with pagination
     
-    Returns posts ordered by most recent first
+    Served from the precomputed Redis timeline when available (see feed.py),
+    otherwise built from the database
     """
-    # Query posts, order by newest first, apply pagination
-    # offset(skip): skip N records (e.g., skip=10 for page 2)
-    # limit(limit): return max N records
-    posts = db.query(models.Post).order_by(models.Post.timestamp.desc()).offset(skip).limit(limit).all()
-    return posts
+    # Fast path: timeline precomputed in Redis
+    body = await feed.read_feed(current_user_id, skip, limit)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+    
+    # Fallback: posts by the user and everyone they follow
+    posts = await db.scalars(feed.timeline_query(current_user_id).offset(skip).limit(limit))
+    
+    # Build the Redis timeline after responding, so the next read takes the fast path
+    background_tasks.add_task(feed.rebuild_feed, current_user_id)
+    return posts.all()
 
 # ============ Create New Post Endpoint ============
 # POST /posts/ - Create a new post
 @router.post("/", response_model=schemas.Post)
-def create_new_post(
+async def create_new_post(
     post: schemas.PostCreate,  # Request body containing post content
     db: db_dependency,
-    current_user: models.User = Depends(auth.get_current_user),  # Requires authentication
+    background_tasks: BackgroundTasks,  # Work to run after the response is sent
+    current_user_id: int = Depends(auth.get_current_user_id),  # Requires authentication
 ):
     """
     Create a new post
@@ -55,28 +137,36 @@ def create_new_post(
     
     Request body: {"content": "Your post text here"}
     """
-    # Create new Post object, linking it to the current user
-    db_post = models.Post(content=post.content, owner_id=current_user.id)
-    
-    # Add to database session
-    db.add(db_post)
+    # Insert the post, linking it to the current user
+    # RETURNING: get the auto-generated fields (id, timestamp) back from the
+    # INSERT itself instead of a refresh SELECT after commit
+    db_post = (await db.scalars(
+        insert(models.Post)
+        .values(content=post.content, owner_id=current_user_id)
+        .returning(models.Post)
+    )).one()
+    
+    # Plain copy of the post for the response and the background task
+    created = schemas.Post.model_validate(db_post)
     
     # Commit to save the post
-    db.commit()
+    await db.commit()
+    await cache.invalidate_feeds()  # Cached feed pages are now stale
     
-    # Refresh to get auto-generated fields (id, timestamp)
-    db.refresh(db_post)
+    # Push the post into followers' timelines after responding
+    background_tasks.add_task(feed.push_to_followers, created)
     
     # Return the created post
-    return db_post
+    return created
 
 # ============ Delete Post Endpoint ============
 # DELETE /posts/{post_id} - Delete a post
 @router.delete("/{post_id}", status_code=204)
-def delete_existing_post(
+async def delete_existing_post(
     post_id: int,  # Post ID from URL path
     db: db_dependency,
-    current_user: models.User = Depends(auth.get_current_user),  # Must be authenticated
+    background_tasks: BackgroundTasks,
+    current_user_id: int = Depends(auth.get_current_user_id),  # Must be authenticated
 ):
     """
     Delete a post
@@ -86,18 +176,22 @@ def delete_existing_post(
     Authorization check: ensures current_user owns the post
     """
     # Find the post by ID
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    post = await db.get(models.Post, post_id)
     
     # Check if post exists AND belongs to current user
     # Security: users can only delete their own posts
-    if post is None or post.owner_id != current_user.id:
+    if post is None or post.owner_id != current_user_id:
         exceptions.raise_not_found_exception('Post not found')
     
     # Delete the post
-    db.delete(post)
+    await db.delete(post)
     
     # Commit the deletion
-    db.commit()
+    await db.commit()
+    await cache.invalidate_feeds()  # Cached feed pages are now stale
+    
+    # Remove the post from followers' timelines after responding
+    background_tasks.add_task(feed.remove_from_followers, post_id, current_user_id)
     
     # 204 No Content - successful deletion
     return
@@ -105,11 +199,11 @@ def delete_existing_post(
 # ============ Update Post Endpoint ============
 # PUT /posts/{post_id} - Edit a post (with time restriction)
 @router.put("/{post_id}", response_model=schemas.Post)
-def update_post(
+async def update_post(
     post_id: int,  # Post ID from URL
     post_update: schemas.PostUpdate,  # New content in request body
     db: db_dependency,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user_id: int = Depends(auth.get_current_user_id),
 ):
     """
     Update a post's content
@@ -120,42 +214,90 @@ def update_post(
     
     This demonstrates time-based authorization logic
     """
-    # Find the post
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
-    if not post:
-        exceptions.raise_not_found_exception('Post not found')
-    
-    # Authorization: only the owner can edit
-    if post.owner_id != current_user.id:
-        exceptions.raise_forbidden_exception('Not authorized to edit this post')
-
     # Time-based restriction: can only edit within 10 minutes
-    # Ensure timestamp is timezone-aware for comparison
-    post_timestamp_aware = post.timestamp.replace(tzinfo=timezone.utc)
-    time_since_creation = datetime.now(timezone.utc) - post_timestamp_aware
+    # Timestamps are stored as naive UTC, so compare against a naive UTC cutoff
+    edit_cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=10)
+    
+    # Update in one statement: the WHERE clause checks existence, ownership and
+    # the edit window together, and RETURNING gives back the updated post
+    post = (await db.scalars(
+        update(models.Post)
+        .where(
+            models.Post.id == post_id,
+            models.Post.owner_id == current_user_id,  # Only the owner can edit
+            models.Post.timestamp >= edit_cutoff,
+        )
+        .values(content=post_update.content)
+        .returning(models.Post)
+    )).first()
     
-    if time_since_creation > timedelta(minutes=10):
+    # Nothing updated: look the post up once to report why
+    if post is None:
+        owner_id = await db.scalar(select(models.Post.owner_id).where(models.Post.id == post_id))
+        if owner_id is None:
+            exceptions.raise_not_found_exception('Post not found')
+        if owner_id != current_user_id:
+            exceptions.raise_forbidden_exception('Not authorized to edit this post')
         exceptions.raise_not_found_exception("You can only edit a post within 10 minutes of its creation")
     
-    # Update the content
-    post.content = post_update.content
-    
-    # Mark as modified in session
-    db.add(post)
+    # Plain copy of the post for the response and the timeline
+    updated = schemas.Post.model_validate(post)
     
     # Save changes
-    db.commit()
+    await db.commit()
+    await cache.invalidate_feeds()  # Cached feed pages are now stale
+    
+    # Keep the timeline copy of the post in sync
+    await feed.update_post_body(updated)
     
     # Return updated post
-    return post
+    return updated
+
+# ============ Engagement Counters ============
+# Atomically add delta to a counter column of a post
+# (UPDATE posts SET likes_count = likes_count + 1 ...) - done in SQL so
+# concurrent likes can't overwrite each other's increments
+async def _adjust_counter(db: AsyncSession, post_id: int, column, delta: int):
+    await db.execute(
+        update(models.Post)
+        .where(models.Post.id == post_id)
+        .values({column: column + delta})
+        .execution_options(synchronize_session=False)
+    )
+
+# Insert a Like/Retweet row in a single statement:
+#   INSERT INTO likes (user_id, post_id)
+#   SELECT :user_id, posts.id FROM posts WHERE posts.id = :post_id
+#   ON CONFLICT DO NOTHING
+# The SELECT only yields a row if the post exists, and ON CONFLICT skips duplicates
+# Returns False if nothing was inserted (post missing OR already liked/retweeted)
+async def _insert_engagement(db: AsyncSession, model, user_id: int, post_id: int) -> bool:
+    stmt = (
+        insert(model)
+        .from_select(
+            ["user_id", "post_id"],
+            select(literal(user_id), models.Post.id).where(models.Post.id == post_id),
+        )
+        .on_conflict_do_nothing()
+    )
+    return (await db.execute(stmt)).rowcount > 0
+
+# Delete a Like/Retweet row in a single statement; returns False if there was none
+async def _delete_engagement(db: AsyncSession, model, user_id: int, post_id: int) -> bool:
+    stmt = delete(model).where(model.user_id == user_id, model.post_id == post_id)
+    return (await db.execute(stmt)).rowcount > 0
+
+# Only called on the error path, to tell "post missing" apart from "duplicate"
+async def _post_exists(db: AsyncSession, post_id: int) -> bool:
+    return await db.scalar(select(exists().where(models.Post.id == post_id)))
 
 # ============ Like Post Endpoint ============
 # POST /posts/{post_id}/like - Like a post
 @router.post("/{post_id}/like", status_code=204)
-def like_post(
+async def like_post(
     post_id: int,  # Post ID from URL
     db: db_dependency,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user_id: int = Depends(auth.get_current_user_id),
 ):
     """
     Like a post
@@ -163,23 +305,17 @@ def like_post(
     - Creates a Like record linking user to post
     - Prevents duplicate likes (composite primary key enforces this at DB level)
     """
-    # Verify post exists
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
-    if post is None:
-        exceptions.raise_not_found_exception('Post not found')
-    
-    # Check if user already liked this post
-    # filter_by() is shorthand for filter() with exact matches
-    like = db.query(models.Like).filter_by(user_id=current_user.id, post_id=post_id).first()
-    if like:
+    # Create the Like record - one statement checks the post exists,
+    # skips duplicates, and inserts
+    if not await _insert_engagement(db, models.Like, current_user_id, post_id):
+        if not await _post_exists(db, post_id):
+            exceptions.raise_not_found_exception('Post not found')
         exceptions.raise_not_found_exception("Already liked")
     
-    # Create new Like record
-    new_like = models.Like(user_id=current_user.id, post_id=post_id)
-    
-    # Save to database
-    db.add(new_like)
-    db.commit()
+    # Bump the post's like counter in the same transaction
+    await _adjust_counter(db, post_id, models.Post.likes_count, +1)
+    await db.commit()
+    await cache.invalidate_feeds()  # Cached feed pages are now stale
     
     # 204 No Content - success
     return
@@ -187,155 +323,135 @@ def like_post(
 # ============ Unlike Post Endpoint ============
 # POST /posts/{post_id}/unlike - Remove a like
 @router.post("/{post_id}/unlike", status_code=204)
-def unlike_post(
+async def unlike_post(
     post_id: int,
     db: db_dependency,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user_id: int = Depends(auth.get_current_user_id),
 ):
     """
     Unlike a post (remove like)
     
     Deletes the Like record if it exists
     """
-    # Find the like record
-    like = db.query(models.Like).filter_by(user_id=current_user.id, post_id=post_id).first()
-    if not like:
+    # Delete the like record (rowcount tells us whether it existed)
+    if not await _delete_engagement(db, models.Like, current_user_id, post_id):
         exceptions.raise_not_found_exception("Not liked yet")
     
-    # Delete the like
-    db.delete(like)
-    db.commit()
+    # Decrement the post's like counter
+    await _adjust_counter(db, post_id, models.Post.likes_count, -1)
+    await db.commit()
+    await cache.invalidate_feeds()  # Cached feed pages are now stale
     
     return
 
 # ============ Retweet Post Endpoint ============
 # POST /posts/{post_id}/retweet - Retweet a post
 @router.post("/{post_id}/retweet", status_code=204)
-def retweet_post(
+async def retweet_post(
     post_id: int,
     db: db_dependency,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user_id: int = Depends(auth.get_current_user_id),
 ):
     """
     Retweet a post
     
     Similar to like but creates a Retweet record (includes timestamp)
     """
-    # Verify post exists
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
-    if post is None:
-        exceptions.raise_not_found_exception('Post not found')
-    
-    # Check if already retweeted
-    retweet = db.query(models.Retweet).filter_by(user_id=current_user.id, post_id=post_id).first()
-    if retweet:
+    # Create Retweet record (the database fills in its timestamp)
+    if not await _insert_engagement(db, models.Retweet, current_user_id, post_id):
+        if not await _post_exists(db, post_id):
+            exceptions.raise_not_found_exception('Post not found')
         exceptions.raise_not_found_exception("Already retweeted")
     
-    # Create Retweet record (includes timestamp unlike Like)
-    new_retweet = models.Retweet(user_id=current_user.id, post_id=post_id)
-    db.add(new_retweet)
-    db.commit()
+    # Bump the post's retweet counter in the same transaction
+    await _adjust_counter(db, post_id, models.Post.retweets_count, +1)
+    await db.commit()
+    await cache.invalidate_feeds()  # Cached feed pages are now stale
     
     return
 
 # ============ Unretweet Post Endpoint ============
 # POST /posts/{post_id}/unretweet - Remove a retweet
 @router.post("/{post_id}/unretweet", status_code=204)
-def unretweet_post(
+async def unretweet_post(
     post_id: int,
     db: db_dependency,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user_id: int = Depends(auth.get_current_user_id),
 ):
     """
     Remove a retweet
     """
-    # Find the retweet record
-    retweet = db.query(models.Retweet).filter_by(user_id=current_user.id, post_id=post_id).first()
-    if not retweet:
+    # Delete the retweet record (rowcount tells us whether it existed)
+    if not await _delete_engagement(db, models.Retweet, current_user_id, post_id):
         exceptions.raise_not_found_exception("Not retweeted yet")
     
-    # Delete the retweet
-    db.delete(retweet)
-    db.commit()
+    # Decrement the post's retweet counter
+    await _adjust_counter(db, post_id, models.Post.retweets_count, -1)
+    await db.commit()
+    await cache.invalidate_feeds()  # Cached feed pages are now stale
     
     return
 
 # ============ Get Posts with Engagement Counts Endpoint ============
 # GET /posts/with_counts/ - Get posts with likes/retweets counts
-@router.get("/with_counts/", response_model=List[schemas.PostWithCounts])
-def read_posts_with_counts(db: db_dependency):
+@router.get("/with_counts/", response_model=List[schemas.PostWithCounts], response_class=ORJSONResponse)
+async def read_posts_with_counts(
+    db: db_dependency,
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+):
     """
-    Advanced endpoint: Get posts with aggregated engagement metrics
+    Advanced endpoint: Get posts with aggregated engagement metrics (paginated)
+    
+    Query parameters:
+    - skip: How many posts to skip (for pagination, default 0)
+    - limit: Max number of posts to return (default 20, at most 100;
+      larger values are rejected with 422)
     
     This demonstrates:
-    - SQL subqueries for aggregation
-    - Multiple table joins
-    - Using func.count() for counting related records
-    - Using func.coalesce() to handle NULL values (posts with 0 likes/retweets)
+    - Denormalized counters: likes/retweets counts stored on the post row
+      and updated incrementally, instead of being recomputed per request
+    - Table joins
     
-    This is more efficient than fetching posts and counting likes/retweets separately
-    """
+    This is more efficient than counting likes/retweets for every request
     
-    # STEP 1: Create a subquery to count likes per post
-    # This is like a temporary table with columns: post_id, likes_count
-    likes_subq = (
-        db.query(
-            models.Like.post_id,  # Group by post
-            func.count(models.Like.user_id).label('likes_count')  # Count likes
-        )
-        .group_by(models.Like.post_id)  # One row per post
-        .subquery()  # Make it a subquery to join later
-    )
-
-    # STEP 2: Create a subquery to count retweets per post
-    # Similar to likes_subq, creates: post_id, retweets_count
-    retweets_subq = (
-        db.query(
-            models.Retweet.post_id,
-            func.count(models.Retweet.user_id).label('retweets_count')
-        )
-        .group_by(models.Retweet.post_id)
-        .subquery()
-    )
-
-    # STEP 3: Main query - join everything together
-    # This creates a result with: Post object, username, likes_count, retweets_count
-    posts = (
-        db.query(
-            models.Post,  # Get all post columns
+    Pages are cached in Redis for a short time (when REDIS_URL is configured)
+    """
+    # Serve from the cache if this page was computed recently
+    cache_key = f"posts:with_counts:{skip}:{limit}"
+    cached = await cache.get_cached(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    # STEP 1: Query the post columns with their owner's username
+    # likes_count/retweets_count are stored on the posts table itself
+    # (maintained by the like/retweet endpoints), so no aggregation is needed
+    # Selecting plain columns (not the Post entity) skips ORM object hydration
+    # lambda_stmt: the statement is built once and cached by the lambda's code
+    # location; later requests only bind new skip/limit values
+    stmt = lambda_stmt(
+        lambda: select(
+            models.Post.id,
+            models.Post.content,
+            models.Post.timestamp,
+            models.Post.owner_id,
             models.User.username.label('owner_username'),  # Get owner's username
-            # coalesce returns first non-NULL value (defaults to 0 if post has no likes)
-            func.coalesce(likes_subq.c.likes_count, 0).label('likes_count'),
-            func.coalesce(retweets_subq.c.retweets_count, 0).label('retweets_count')
+            models.Post.likes_count,  # Stored counter
+            models.Post.retweets_count,  # Stored counter
         )
         # INNER JOIN User - every post must have an owner
         .join(models.User, models.Post.owner_id == models.User.id)
-        
-        # LEFT OUTER JOIN likes subquery - includes posts even if they have 0 likes
-        .outerjoin(likes_subq, models.Post.id == likes_subq.c.post_id)
-        
-        # LEFT OUTER JOIN retweets subquery - includes posts even if they have 0 retweets
-        .outerjoin(retweets_subq, models.Post.id == retweets_subq.c.post_id)
-        
-        .order_by(models.Post.timestamp.desc())  # Newest first
-        .all()  # Execute and return all results
+        .order_by(models.Post.timestamp.desc(), models.Post.id.desc())  # Newest first (id breaks ties within a second)
     )
+    stmt += lambda s: s.offset(skip).limit(limit)  # skip/limit become bound parameters
+    rows = (await db.execute(stmt)).mappings()  # Each row as a column-name -> value mapping
 
-    # STEP 4: Transform database results into Pydantic schema objects
-    # The query returns tuples of (Post, username, likes_count, retweets_count)
-    response_posts = []
-    for post, owner_username, likes_count, retweets_count in posts:
-        # Create PostWithCounts schema object for each post
-        response_posts.append(schemas.PostWithCounts(
-            id=post.id,
-            content=post.content,
-            timestamp=post.timestamp,
-            owner_id=post.owner_id,
-            owner_username=owner_username,  # From the join
-            likes_count=likes_count,  # From the subquery
-            retweets_count=retweets_count  # From the subquery
-        ))
+    # STEP 2: Validate each row into the response schema
+    response_posts = [schemas.PostWithCounts.model_validate(dict(row)) for row in rows]
 
-    return response_posts
+    # STEP 3: Serialize once, cache it, and return the same bytes
+    body = orjson.dumps([p.model_dump(mode="json") for p in response_posts])
+    await cache.set_cached_feed(cache_key, body)
+    return Response(content=body, media_type="application/json")
 
 
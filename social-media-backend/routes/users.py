@@ -3,13 +3,17 @@ User Routes
 Handles user registration, follow/unfollow functionality
 """
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, exists, literal, select
+from sqlalchemy.dialects.sqlite import insert  # SQLite INSERT with ON CONFLICT support
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
 from .. import models, schemas, auth
+from .. import feed  # Per-user timelines in Redis (fan-out on write)
 from ..database import get_db
 from ..exceptions import (
-    raise_not_found_exception,
+    raise_user_not_found,
     raise_bad_request_exception,
     raise_conflict_exception,
 )
@@ -21,45 +25,52 @@ router = APIRouter(
 )
 
 # Type alias for database dependency injection
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
 # ============ User Registration Endpoint ============
 # POST /users/ - Create a new user account
 @router.post("/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: db_dependency):
+async def create_user(user: schemas.UserCreate, db: db_dependency):
     """
     Register a new user
     
     Flow:
     1. Receive username, email, and password from request
-    2. Check if username already exists (must be unique)
-    3. Hash the password (never store plain text!)
-    4. Create new user in database
-    5. Return the created user info (without password)
-    """
-    # Check if username is already taken
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
-    if db_user:
-        raise_conflict_exception("Username already registered")
-    
-    # Hash the password using bcrypt (one-way encryption)
-    hashed_password = auth.get_password_hash(user.password)
-    
-    # Create new User instance
-    new_user = models.User(
-        username=user.username, 
-        email=user.email, 
-        hashed_password=hashed_password
-    )
+    2. Hash the password (never store plain text!)
+    3. Insert the user unless the username or email is taken (both must be unique)
+    4. Return the created user info (without password)
     
-    # Add to database session (staging area)
-    db.add(new_user)
+    The slow (CPU-bound) password hash runs in the threadpool so it never
+    blocks the event loop
+    """
+    # Hash the password (one-way encryption) before touching the database,
+    # so a pooled connection isn't held open while the hash is computed
+    hashed_password = await run_in_threadpool(auth.get_password_hash, user.password)
+    
+    # Insert in one statement, letting the unique indexes on username and email decide
+    # ON CONFLICT DO NOTHING (no target): no row is inserted (or returned) if
+    # either the username or the email already exists
+    # RETURNING: get the generated id and created_at back without a second query
+    # (no race between a "does it exist?" check and the insert)
+    new_user = (await db.scalars(
+        insert(models.User)
+        .values(
+            username=user.username,
+            email=user.email,
+            hashed_password=hashed_password,
+        )
+        .on_conflict_do_nothing()
+        .returning(models.User)
+    )).first()
+    
+    # Nothing inserted - find out which value is taken (only runs on the error path)
+    if new_user is None:
+        if await db.scalar(select(exists().where(models.User.username == user.username))):
+            raise_conflict_exception("Username already registered")
+        raise_conflict_exception("Email already registered")
     
     # Commit transaction (actually write to database)
-    db.commit()
-    
-    # Refresh to get the auto-generated ID and created_at timestamp
-    db.refresh(new_user)
+    await db.commit()
     
     # Return user object (password not included due to response_model)
     return new_user
@@ -67,10 +78,10 @@ def create_user(user: schemas.UserCreate, db: db_dependency):
 # ============ Follow User Endpoint ============
 # POST /users/{user_id}/follow - Follow another user
 @router.post("/{user_id}/follow", status_code=204)
-def follow_user(
+async def follow_user(
     user_id: int,  # ID from URL path parameter
     db: db_dependency,
-    current_user: models.User = Depends(auth.get_current_user),  # Authenticated user (from JWT)
+    current_user_id: int = Depends(auth.get_current_user_id),  # Authenticated user (from JWT)
 ):
     """
     Follow another user
@@ -79,28 +90,40 @@ def follow_user(
     
     Flow:
     1. Extract user_id from URL (who to follow)
-    2. Verify that user exists
-    3. Check business rules (can't follow yourself, can't follow twice)
-    4. Add to following relationship
+    2. Check business rules (can't follow yourself)
+    3. Add to following relationship if that user exists and isn't followed yet
     """
-    # Find the user to follow in database
-    user_to_follow = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user_to_follow:
-        raise_not_found_exception("User not found")
-    
     # Business logic validation: can't follow yourself
-    if user_to_follow == current_user:
+    if user_id == current_user_id:
         raise_bad_request_exception("Cannot follow yourself")
     
-    # Check if already following (prevent duplicate follows)
-    if user_to_follow in current_user.following:
-        raise_bad_request_exception("Already following this user")
+    # Insert the Follow row in a single statement:
+    #   INSERT INTO follows (follower_id, followee_id)
+    #   SELECT :current_user_id, users.id FROM users WHERE users.id = :user_id
+    #   ON CONFLICT DO NOTHING
+    # The SELECT only yields a row if the user exists (SQLite doesn't enforce
+    # foreign keys by default, so the FK can't be relied on), and the composite
+    # primary key makes a repeat follow a no-op - no race between a check and the insert
+    result = await db.execute(
+        insert(models.Follow)
+        .from_select(
+            ["follower_id", "followee_id"],
+            select(literal(current_user_id), models.User.id).where(models.User.id == user_id),
+        )
+        .on_conflict_do_nothing()
+    )
     
-    # Add to following list (SQLAlchemy handles the Follow junction table automatically)
-    current_user.following.append(user_to_follow)
+    # Nothing inserted - find out why (only runs on the error path)
+    if result.rowcount == 0:
+        if not await db.scalar(select(exists().where(models.User.id == user_id))):
+            raise_user_not_found()
+        raise_bad_request_exception("Already following this user")
     
     # Save changes to database
-    db.commit()
+    await db.commit()
+    
+    # The cached timeline lacks the new followee's earlier posts - rebuild it on next read
+    await feed.drop_feed(current_user_id)
     
     # 204 No Content - success but no response body needed
     return
@@ -108,10 +131,10 @@ def follow_user(
 # ============ Unfollow User Endpoint ============
 # POST /users/{user_id}/unfollow - Unfollow a user
 @router.post("/{user_id}/unfollow", status_code=204)
-def unfollow_user(
+async def unfollow_user(
     user_id: int,  # ID from URL path parameter
     db: db_dependency,
-    current_user: models.User = Depends(auth.get_current_user),  # Authenticated user
+    current_user_id: int = Depends(auth.get_current_user_id),  # Authenticated user
 ):
     """
     Unfollow a user you're currently following
@@ -120,24 +143,28 @@ def unfollow_user(
     
     Similar to follow but removes the relationship
     """
-    # Find the user to unfollow
-    user_to_unfollow = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user_to_unfollow:
-        raise_not_found_exception("User not found")
-    
     # Validation: can't unfollow yourself
-    if user_to_unfollow == current_user:
+    if user_id == current_user_id:
         raise_bad_request_exception("Cannot unfollow yourself")
     
-    # Check if actually following this user
-    if user_to_unfollow not in current_user.following:
-        raise_bad_request_exception("Not following this user")
+    # Delete the Follow row directly (removes entry from Follow junction table)
+    result = await db.execute(
+        delete(models.Follow)
+        .where(models.Follow.c.follower_id == current_user_id)
+        .where(models.Follow.c.followee_id == user_id)
+    )
     
-    # Remove from following list (removes entry from Follow junction table)
-    current_user.following.remove(user_to_unfollow)
+    # Nothing deleted - find out why (only runs on the error path)
+    if result.rowcount == 0:
+        if not await db.scalar(select(exists().where(models.User.id == user_id))):
+            raise_user_not_found()
+        raise_bad_request_exception("Not following this user")
     
     # Save changes
-    db.commit()
+    await db.commit()
+    
+    # The cached timeline still holds the unfollowed user's posts - rebuild it on next read
+    await feed.drop_feed(current_user_id)
     
     # 204 No Content - success
     return
\ No newline at end of file
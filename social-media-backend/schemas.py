@@ -1,8 +1,8 @@
 # Pydantic schemas - these define the shape of data for API requests/responses
 # Unlike SQLAlchemy models (database), these validate and serialize API data
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 # ============ User Schemas ============
 
@@ -22,11 +22,10 @@ class User(UserBase):
     id: int  # Database ID
     created_at: datetime  # When account was created
     
-    # Config tells Pydantic to work with SQLAlchemy ORM objects
+    # model_config tells Pydantic to work with SQLAlchemy ORM objects
     # from_attributes=True allows: User.model_validate(db_user_object)
     # Without this, you'd need to manually convert db objects to dicts
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # ============ Token Schemas ============
 
@@ -56,6 +55,15 @@ class Post(PostBase):
     timestamp: datetime  # When post was created
     owner_id: int        # ID of user who created the post
 
+    # Built from Post ORM objects (inherited by PostWithCounts)
+    model_config = ConfigDict(from_attributes=True)
+
+# PostPage: One page of posts plus the cursor for the next page
+# next_cursor is None on the last page
+class PostPage(BaseModel):
+    posts: List[Post]
+    next_cursor: Optional[str] = None
+
 # PostWithCounts: Extended post schema with engagement metrics
 # Used in feed endpoints to show likes/retweets counts
 class PostWithCounts(Post):
@@ -67,9 +75,6 @@ class PostWithCounts(Post):
 class PostUpdate(BaseModel):
     content: str  # New content to replace old content
 
-    class Config:
-        from_attributes = True  # Allow conversion from SQLAlchemy objects
-
 # ============ Like Schemas ============
 # (Optional - not heavily used in current API but available if needed)
 
@@ -77,9 +82,6 @@ class Like(BaseModel):
     user_id: int  # ID of user who liked
     post_id: int  # ID of post that was liked
 
-    class Config:
-        from_attributes = True  # Allow conversion from SQLAlchemy objects
-
 # ============ Retweet Schemas ============
 # (Optional - not heavily used in current API but available if needed)
 
@@ -87,6 +89,3 @@ class Retweet(BaseModel):
     user_id: int       # ID of user who retweeted
     post_id: int       # ID of post that was retweeted
     timestamp: datetime  # When the retweet happened
-
-    class Config:
-        from_attributes = True  # Allow conversion from SQLAlchemy objects
\ No newline at end of file